@@ -6,6 +6,7 @@ Enhanced Multi-Round Debate System
 """
 import time
 import json
+import threading
 from typing import List, Dict, Tuple, Optional, Union
 from pathlib import Path
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -643,6 +644,7 @@ class EnhancedDebateSystem:
 
 # Singleton instance
 enhanced_debate = None
+_enhanced_debate_lock = threading.Lock()  # startup warmup and requests may race to build it
 
 def get_enhanced_debate(
     data_dir: str = "data",
@@ -651,9 +653,11 @@ def get_enhanced_debate(
 ) -> EnhancedDebateSystem:
     global enhanced_debate
     if enhanced_debate is None:
-        enhanced_debate = EnhancedDebateSystem(
-            data_dir=data_dir,
-            embedding_model_path=embedding_model_path,
-            use_embeddings=use_embeddings
-        )
+        with _enhanced_debate_lock:
+            if enhanced_debate is None:
+                enhanced_debate = EnhancedDebateSystem(
+                    data_dir=data_dir,
+                    embedding_model_path=embedding_model_path,
+                    use_embeddings=use_embeddings
+                )
     return enhanced_debate
@@ -2,13 +2,16 @@
 Debate History Storage using SQLite
 เก็บประวัติการสนทนาระหว่าง AI agents
 """
+import os
 import sqlite3
 import json
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 DB_PATH = Path(__file__).parent.parent / "data" / "debates.db"
+AUDIO_DIR = DB_PATH.parent / "audio"
 
 
 def get_connection():
@@ -16,6 +19,8 @@ def get_connection():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(DB_PATH))
     conn.row_factory = sqlite3.Row
+    # WAL (set in init_db) is crash-safe with NORMAL sync; avoids an fsync per commit
+    conn.execute("PRAGMA synchronous=NORMAL")
     return conn
 
 
@@ -24,6 +29,9 @@ def init_db():
     conn = get_connection()
     cursor = conn.cursor()
     
+    # Persistent per database file: appends no longer block readers
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS debates (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,15 +50,30 @@ def init_db():
             agent TEXT NOT NULL,
             content TEXT NOT NULL,
             msg_order INTEGER DEFAULT 0,
+            audio_path TEXT,
+            duration REAL,
             FOREIGN KEY (debate_id) REFERENCES debates(id)
         )
     """)
     
+    # Databases created before audio caching lack these columns
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(messages)")}
+    if "audio_path" not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN audio_path TEXT")
+    if "duration" not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN duration REAL")
+    
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_messages_debate 
         ON messages(debate_id)
     """)
     
+    # History list and search both sort by newest first
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_debates_created_at 
+        ON debates(created_at)
+    """)
+    
     conn.commit()
     conn.close()
 
@@ -87,11 +110,13 @@ def save_debate(
     debate_id = cursor.lastrowid
     
     # Insert messages
-    for i, msg in enumerate(messages):
-        cursor.execute("""
-            INSERT INTO messages (debate_id, agent, content, msg_order)
-            VALUES (?, ?, ?, ?)
-        """, (debate_id, msg.get('agent', ''), msg.get('content', ''), i))
+    cursor.executemany("""
+        INSERT INTO messages (debate_id, agent, content, msg_order)
+        VALUES (?, ?, ?, ?)
+    """, [
+        (debate_id, msg.get('agent', ''), msg.get('content', ''), i)
+        for i, msg in enumerate(messages)
+    ])
     
     conn.commit()
     conn.close()
@@ -153,15 +178,18 @@ def get_debate(debate_id: int) -> Optional[Dict]:
     
     # Get messages
     cursor.execute("""
-        SELECT agent, content, msg_order
+        SELECT id, agent, content, msg_order, audio_path, duration
         FROM messages WHERE debate_id = ?
         ORDER BY msg_order
     """, (debate_id,))
     
     for msg_row in cursor.fetchall():
         debate["messages"].append({
+            "id": msg_row["id"],
             "agent": msg_row["agent"],
-            "content": msg_row["content"]
+            "content": msg_row["content"],
+            "audio_path": msg_row["audio_path"],
+            "duration": msg_row["duration"]
         })
     
     conn.close()
@@ -195,11 +223,78 @@ def search_debates(query: str) -> List[Dict]:
     return debates
 
 
+def save_message_audio(message_id: int, audio_bytes: bytes, duration: float) -> str:
+    """
+    Store synthesized audio for a message so later plays skip TTS
+    
+    Returns:
+        audio_path (relative to AUDIO_DIR)
+    """
+    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+    audio_path = f"{message_id}.mp3"
+    
+    # Write a private temp file, then swap it in: concurrent writers (background prefetch,
+    # Play All) never interleave, and readers never see a half-written mp3
+    fd, tmp_path = tempfile.mkstemp(dir=AUDIO_DIR, prefix=f"{message_id}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(audio_bytes)
+        os.replace(tmp_path, AUDIO_DIR / audio_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    
+    conn = get_connection()
+    conn.execute(
+        "UPDATE messages SET audio_path = ?, duration = ? WHERE id = ?",
+        (audio_path, duration, message_id)
+    )
+    conn.commit()
+    conn.close()
+    
+    return audio_path
+
+
+def load_message_audio(message: Dict) -> Optional[bytes]:
+    """Get cached audio for a message returned by get_debate (None if not cached yet)"""
+    audio_path = message.get("audio_path")
+    if not audio_path:
+        return None
+    
+    path = AUDIO_DIR / audio_path
+    if not path.exists():
+        return None
+    return path.read_bytes()
+
+
+def load_cached_audio(message_id: int) -> Optional[Tuple[bytes, float]]:
+    """Get (audio_bytes, duration) for a message straight from the DB (None if not cached yet)"""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT audio_path, duration FROM messages WHERE id = ?", (message_id,)
+    ).fetchone()
+    conn.close()
+    
+    if not row:
+        return None
+    audio_bytes = load_message_audio(dict(row))
+    if not audio_bytes:
+        return None
+    return audio_bytes, row["duration"] or 0
+
+
 def delete_debate(debate_id: int):
-    """Delete a debate and its messages"""
+    """Delete a debate, its messages and their cached audio"""
     conn = get_connection()
     cursor = conn.cursor()
     
+    cursor.execute("""
+        SELECT audio_path FROM messages
+        WHERE debate_id = ? AND audio_path IS NOT NULL
+    """, (debate_id,))
+    for row in cursor.fetchall():
+        (AUDIO_DIR / row["audio_path"]).unlink(missing_ok=True)
+    
     cursor.execute("DELETE FROM messages WHERE debate_id = ?", (debate_id,))
     cursor.execute("DELETE FROM debates WHERE id = ?", (debate_id,))
     
@@ -0,0 +1,71 @@
+# app/core/jsonl.py
+"""
+JSON Lines helpers
+Uses orjson when installed (much faster parse/serialize), stdlib json otherwise
+"""
+import json
+import os
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this catches both
+JSONDecodeError = json.JSONDecodeError
+
+
+if HAS_ORJSON:
+    def loads(data):
+        """Parse one JSON document from str or bytes"""
+        return orjson.loads(data)
+
+    def dumps(obj) -> bytes:
+        """Serialize obj to compact UTF-8 JSON"""
+        return orjson.dumps(obj)
+
+    def dumps_line(obj) -> bytes:
+        """Serialize obj as one UTF-8 JSONL line (with trailing newline)"""
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    def loads(data):
+        """Parse one JSON document from str or bytes"""
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        """Serialize obj to compact UTF-8 JSON"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def dumps_line(obj) -> bytes:
+        """Serialize obj as one UTF-8 JSONL line (with trailing newline)"""
+        return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def iter_lines(path, chunk_size: int = 1 << 20):
+    """
+    Yield (line_number, line_bytes) for every non-blank line of a JSONL file
+    Reads the file in large binary chunks instead of decoding it line by line;
+    line numbers count blank lines too, same as enumerate(f, 1)
+    """
+    line_num = 0
+    tail = b""
+    with open(path, 'rb') as f:
+        if hasattr(os, "posix_fadvise"):
+            # Whole file is read front to back: let the kernel read ahead aggressively
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()  # incomplete last line, finished by the next chunk
+            for line in lines:
+                line_num += 1
+                line = line.strip()
+                if line:
+                    yield line_num, line
+    
+    tail = tail.strip()
+    if tail:
+        yield line_num + 1, tail
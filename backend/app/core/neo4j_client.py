@@ -3,12 +3,42 @@
 Neo4j database client for Knowledge Graph operations
 """
 from neo4j import GraphDatabase
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Union
 from contextlib import contextmanager
 from .config import settings
 from .schemas import GraphNode, GraphEdge, NodeType, EdgeType
 
 
+UNWIND_BATCH_SIZE = 5000  # rows per UNWIND transaction in the *_batch methods
+
+def _node_row(node: Union[GraphNode, dict]) -> dict:
+    """UNWIND row for a node; plain node dicts (e.g. from the extractor) pass straight through"""
+    if isinstance(node, dict):
+        return node
+    return {
+        "id": node.id,
+        "name": node.name,
+        "type": node.type.value,
+        "description": node.description,
+        "source_book": node.source_book,
+        "source_chapter": node.source_chapter
+    }
+
+
+def _edge_row(edge: Union[GraphEdge, dict]) -> dict:
+    """UNWIND row for an edge; plain edge dicts pass straight through"""
+    if isinstance(edge, dict):
+        return edge
+    return {
+        "source": edge.source,
+        "target": edge.target,
+        "type": edge.type.value,
+        "weight": edge.weight,
+        "description": edge.description,
+        "source_book": edge.source_book
+    }
+
+
 class Neo4jClient:
     """Client for Neo4j database operations"""
     
@@ -26,10 +56,19 @@ class Neo4jClient:
             # Verify connection
             self.driver.verify_connectivity()
             print("✅ Connected to Neo4j")
+            self._ensure_indexes()
         except Exception as e:
             print(f"⚠️ Neo4j connection failed: {e}")
             self.driver = None
     
+    def _ensure_indexes(self):
+        """Index Node.id so MERGE/MATCH by id is a lookup, not a label scan"""
+        try:
+            with self.driver.session() as session:
+                session.run("CREATE INDEX node_id IF NOT EXISTS FOR (n:Node) ON (n.id)").consume()
+        except Exception as e:
+            print(f"⚠️ Could not create Node.id index: {e}")
+    
     def close(self):
         """Close the database connection"""
         if self.driver:
@@ -76,8 +115,8 @@ class Neo4jClient:
             print(f"Error creating node: {e}")
             return False
     
-    def create_nodes_batch(self, nodes: List[GraphNode]) -> int:
-        """Create multiple nodes in batch"""
+    def create_nodes_batch(self, nodes: Iterable[Union[GraphNode, dict]]) -> int:
+        """Create multiple nodes in batch (GraphNode models or node dicts)"""
         query = """
         UNWIND $nodes AS node
         MERGE (n:Node {id: node.id})
@@ -87,24 +126,7 @@ class Neo4jClient:
             n.source_book = node.source_book,
             n.source_chapter = node.source_chapter
         """
-        try:
-            with self.session() as session:
-                nodes_data = [
-                    {
-                        "id": n.id,
-                        "name": n.name,
-                        "type": n.type.value,
-                        "description": n.description,
-                        "source_book": n.source_book,
-                        "source_chapter": n.source_chapter
-                    }
-                    for n in nodes
-                ]
-                session.run(query, nodes=nodes_data)
-            return len(nodes)
-        except Exception as e:
-            print(f"Error creating nodes batch: {e}")
-            return 0
+        return self._run_unwind(query, "nodes", [_node_row(n) for n in nodes])
     
     # ==================== Edge Operations ====================
     
@@ -133,8 +155,8 @@ class Neo4jClient:
             print(f"Error creating edge: {e}")
             return False
     
-    def create_edges_batch(self, edges: List[GraphEdge]) -> int:
-        """Create multiple edges in batch"""
+    def create_edges_batch(self, edges: Iterable[Union[GraphEdge, dict]]) -> int:
+        """Create multiple edges in batch (GraphEdge models or edge dicts)"""
         query = """
         UNWIND $edges AS edge
         MATCH (a:Node {id: edge.source})
@@ -144,24 +166,23 @@ class Neo4jClient:
             r.description = edge.description,
             r.source_book = edge.source_book
         """
+        return self._run_unwind(query, "edges", [_edge_row(e) for e in edges])
+    
+    def _run_unwind(self, query: str, param: str, rows: List[dict]) -> int:
+        """Run an UNWIND query over rows, UNWIND_BATCH_SIZE rows per transaction; returns rows written"""
+        written = 0
         try:
             with self.session() as session:
-                edges_data = [
-                    {
-                        "source": e.source,
-                        "target": e.target,
-                        "type": e.type.value,
-                        "weight": e.weight,
-                        "description": e.description,
-                        "source_book": e.source_book
-                    }
-                    for e in edges
-                ]
-                session.run(query, edges=edges_data)
-            return len(edges)
+                for i in range(0, len(rows), UNWIND_BATCH_SIZE):
+                    batch = rows[i:i + UNWIND_BATCH_SIZE]
+                    try:
+                        session.run(query, **{param: batch}).consume()
+                        written += len(batch)
+                    except Exception as e:
+                        print(f"Error creating {param} batch: {e}")
         except Exception as e:
-            print(f"Error creating edges batch: {e}")
-            return 0
+            print(f"Error creating {param} batch: {e}")
+        return written
     
     # ==================== Query Operations ====================
     
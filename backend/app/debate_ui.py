@@ -2,15 +2,22 @@ import streamlit as st
 import time
 import sys
 import os
+import json
+import base64
+import html
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Add parent directory to path to import app modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.agents.enhanced_debate import get_enhanced_debate
 from app.core.neo4j_client import neo4j_client
+from app.core.schemas import GraphNode, GraphEdge
 from app.core.debate_history import (
-    save_debate, get_all_debates, get_debate, search_debates, delete_debate, get_stats as get_history_stats
+    save_debate, get_all_debates, get_debate, search_debates, delete_debate, get_stats as get_history_stats,
+    save_message_audio, load_message_audio, load_cached_audio
 )
 from app.core import tts
 from streamlit_agraph import agraph, Node, Edge, Config
@@ -19,25 +26,76 @@ from streamlit_agraph import agraph, Node, Edge, Config
 # TTS Helper
 # ============================================
 
-def render_message_with_tts(agent, content, key_prefix, auto_play=False):
+# role -> (label, card css class)
+AGENT_STYLE = {
+    "Attacker": ("🔴 ทาม (Time)", "attacker-card"),
+    "Defender": ("🟢 แอน (Ann)", "defender-card"),
+    "Strategist": ("🟣 ไมค์ (Mike)", "strategist-card"),
+}
+
+# Names each role can appear under in an agent string (checked in this order)
+AGENT_KEYWORDS = {
+    "Attacker": ("Attacker", "Time"),
+    "Defender": ("Defender", "Ann"),
+    "Strategist": ("Strategist", "Mike"),
+}
+
+@lru_cache(maxsize=None)
+def get_agent_role(agent):
+    """Map an agent name to its AGENT_STYLE role (None if it has no dedicated style)"""
+    return next(
+        (role for role, keywords in AGENT_KEYWORDS.items() if any(k in agent for k in keywords)),
+        None
+    )
+
+def get_message_audio(msg):
+    """
+    Returns (audio_bytes, duration) for a saved message. Synthesized once, then read from disk.
+    """
+    audio_bytes = load_message_audio(msg)
+    if audio_bytes:
+        return audio_bytes, msg.get('duration') or 0
+    
+    # msg was read at render time; the background prefetch may have cached it since
+    if msg.get('id') is not None:
+        cached = load_cached_audio(msg['id'])
+        if cached:
+            return cached
+    
+    audio_bytes, duration = tts.get_audio_for_agent_with_duration(msg['content'], msg['agent'])
+    if audio_bytes and msg.get('id') is not None:
+        save_message_audio(msg['id'], audio_bytes, duration)
+    return audio_bytes, duration
+
+@st.cache_resource
+def get_audio_prefetcher():
+    return ThreadPoolExecutor(max_workers=2)
+
+def prefetch_debate_audio(debate_id):
+    """Synthesize and cache audio for a just-saved debate in the background"""
+    debate = get_debate(debate_id)
+    if debate:
+        prefetcher = get_audio_prefetcher()
+        for msg in debate['messages']:
+            prefetcher.submit(get_message_audio, msg)
+
+def render_message_with_tts(agent, content, key_prefix, auto_play=False, message=None):
     """
     Renders a message with optional TTS. If auto_play=True, generates and plays immediately.
+    Pass the saved history row as message to reuse its cached audio.
     """
     # Determine style based on agent
-    style_class = "agent-card"
-    label = agent
-    if "Attacker" in agent or "Time" in agent:
-        style_class = "agent-card attacker-card"
-        label = "🔴 ทาม (Time)"
-    elif "Defender" in agent or "Ann" in agent:
-        style_class = "agent-card defender-card"
-        label = "🟢 แอน (Ann)"
-    elif "Strategist" in agent or "Mike" in agent:
-        style_class = "agent-card strategist-card"
-        label = "🟣 ไมค์ (Mike)"
+    role = get_agent_role(agent)
+    if role:
+        label, card_class = AGENT_STYLE[role]
+        style_class = f"agent-card {card_class}"
+    else:
+        label, style_class = agent, "agent-card"
     
-    # Display message card
-    st.markdown(f"<div class='{style_class}'><b>{label}</b><br>{content}</div>", unsafe_allow_html=True)
+    # Display message card as a single HTML block (blank lines in content would otherwise
+    # end the <div> early and spill the rest out as separate markdown)
+    body = html.escape(content).replace("\n", "<br>")
+    st.markdown(f"<div class='{style_class}'><b>{label}</b><br>{body}</div>", unsafe_allow_html=True)
     
     # Auto-play mode: generate and play immediately
     if auto_play:
@@ -48,7 +106,10 @@ def render_message_with_tts(agent, content, key_prefix, auto_play=False):
         # Manual button mode
         btn_key = f"tts_{key_prefix}"
         if st.button("🔊 ฟังเสียง", key=btn_key):
-            audio_bytes = tts.get_audio_for_agent(content, agent)
+            if message is not None:
+                audio_bytes, _ = get_message_audio(message)
+            else:
+                audio_bytes = tts.get_audio_for_agent(content, agent)
             if audio_bytes:
                 st.audio(audio_bytes, format="audio/mp3", start_time=0)
 
@@ -89,12 +150,24 @@ st.markdown("""
 # Helper Functions
 # ============================================
 
+NODE_TYPE_COLORS = {
+    "concept": "#5e35b1", "technique": "#e53935",
+    "risk": "#fb8c00", "defense": "#43a047", "book": "#1e88e5"
+}
+
 TOPICS_FILE = Path("scripts/topics.txt")
 COMPLETED_FILE = Path("scripts/completed_topics.txt")
 
-def load_topics():
-    if not TOPICS_FILE.exists():
-        return []
+def _file_signature(path):
+    """(mtime_ns, size) of a file, or None if it does not exist"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_data(show_spinner=False)
+def _load_topics_cached(signature):
     topics = []
     with open(TOPICS_FILE, 'r', encoding='utf-8') as f:
         for line in f:
@@ -103,13 +176,26 @@ def load_topics():
                 topics.append(line)
     return topics
 
-def load_completed():
-    if not COMPLETED_FILE.exists():
-        return set()
+@st.cache_data(show_spinner=False)
+def _load_completed_cached(signature):
     with open(COMPLETED_FILE, 'r', encoding='utf-8') as f:
         return {line.strip() for line in f if line.strip()}
 
+# Reruns only hit the disk again when the file's signature changes
+def load_topics():
+    signature = _file_signature(TOPICS_FILE)
+    if signature is None:
+        return []
+    return _load_topics_cached(signature)
+
+def load_completed():
+    signature = _file_signature(COMPLETED_FILE)
+    if signature is None:
+        return set()
+    return _load_completed_cached(signature)
+
 def save_completed(topic):
+    # Appending changes the file signature, so the next load_completed() re-reads it
     with open(COMPLETED_FILE, 'a', encoding='utf-8') as f:
         f.write(f"{topic}\n")
 
@@ -202,7 +288,6 @@ with tab1:
                         node_count += len(event['nodes'])
                         edge_count += len(event['edges'])
                         
-                        from app.core.schemas import GraphNode, GraphEdge
                         for n in event['nodes']:
                             try: neo4j_client.create_node(GraphNode(**n))
                             except: pass
@@ -214,13 +299,14 @@ with tab1:
                 
                 # Save to history
                 if st.session_state.single_messages:
-                    save_debate(
+                    debate_id = save_debate(
                         topic=topic,
                         messages=st.session_state.single_messages,
                         rounds=rounds,
                         node_count=node_count,
                         edge_count=edge_count
                     )
+                    prefetch_debate_audio(debate_id)
                     st.toast("📖 บันทึกประวัติแล้ว!")
                 
                 st.session_state.single_running = False
@@ -298,9 +384,9 @@ with tab2:
             node_count = 0
             edge_count = 0
             
-            # Show topic header in conversation
+            # Show topic header in conversation (with the separator from the previous topic)
             with conversation_area:
-                st.markdown(f"### 🎯 {topic}")
+                st.markdown(f"---\n\n### 🎯 {topic}" if i > 0 else f"### 🎯 {topic}")
             
             try:
                 for event in system.stream_debate(topic=topic, rounds=auto_rounds, delay=3):
@@ -322,7 +408,6 @@ with tab2:
                         node_count += len(nodes)
                         edge_count += len(edges)
                         
-                        from app.core.schemas import GraphNode, GraphEdge
                         for n in nodes:
                             try: neo4j_client.create_node(GraphNode(**n))
                             except: pass
@@ -334,13 +419,14 @@ with tab2:
                             st.caption(f"📊 สกัดได้ {len(nodes)} nodes, {len(edges)} edges")
                 
                 # Save to SQLite history
-                save_debate(
+                debate_id = save_debate(
                     topic=topic,
                     messages=messages,
                     rounds=auto_rounds,
                     node_count=node_count,
                     edge_count=edge_count
                 )
+                prefetch_debate_audio(debate_id)
                 
                 save_completed(topic)
                 with log_area:
@@ -348,13 +434,27 @@ with tab2:
                 
                 # Delay before next
                 if i < len(pending) - 1:
-                    with conversation_area:
-                        st.markdown("---")
-                    for sec in range(delay_between, 0, -1):
-                        status_text.markdown(f"⏸️ **รอ {sec} วินาที** ก่อนหัวข้อถัดไป...")
+                    # Countdown text ticks in the browser
+                    with status_text:
+                        st.components.v1.html(f"""
+                        <div style="color: #c9d1d9; font-family: sans-serif;">
+                            ⏸️ <b>รอ <span id="countdown">{delay_between}</span> วินาที</b> ก่อนหัวข้อถัดไป...
+                        </div>
+                        <script>
+                            let secondsLeft = {delay_between};
+                            const countdown = document.getElementById('countdown');
+                            const timer = setInterval(() => {{
+                                secondsLeft--;
+                                countdown.textContent = Math.max(secondsLeft, 0);
+                                if (secondsLeft <= 0) clearInterval(timer);
+                            }}, 1000);
+                        </script>
+                        """, height=30)
+                    # Advance the progress bar once a second: emitting an element is what lets
+                    # Streamlit stop this run when Stop is clicked (a sleep alone can't be interrupted)
+                    for waited in range(1, delay_between + 1):
                         time.sleep(1)
-                        if not st.session_state.auto_running:
-                            break
+                        progress.progress((i + waited / delay_between) / len(pending))
                 
             except Exception as e:
                 with log_area:
@@ -391,8 +491,10 @@ with tab3:
     except:
         pass
     
-    # Search
-    search_query = st.text_input("🔍 ค้นหาหัวข้อ", key="history_search")
+    # Search (inside a form so typing doesn't rerun the page on every keystroke)
+    with st.form("history_search_form"):
+        search_query = st.text_input("🔍 ค้นหาหัวข้อ", key="history_search")
+        st.form_submit_button("ค้นหา")
     
     # Load debates
     if search_query:
@@ -418,39 +520,57 @@ with tab3:
                     col_play, col_del = st.columns([0.8, 0.2])
                     with col_play:
                         if st.button("▶️ ฟังทั้งหัวข้อ", key=f"play_all_{debate['id']}", use_container_width=True):
-                            st.info("🎙️ กำลังสร้างเสียง... กรุณารอสักครู่")
+                            messages_to_play = full_debate['messages']
                             
-                            # Pre-generate all audio files
-                            import base64
-                            audio_data_list = []
-                            for msg in full_debate['messages']:
-                                agent = msg['agent']
-                                content = msg['content']
-                                audio_bytes, _ = tts.get_audio_for_agent_with_duration(content, agent)
-                                if audio_bytes:
-                                    b64 = base64.b64encode(audio_bytes).decode()
-                                    audio_data_list.append(b64)
+                            # The player keeps its queue on the parent window so the
+                            # feeder snippets below can push clips into it as they finish.
+                            queue_name = f"audioQ_{debate['id']}_{int(time.time() * 1000)}"
                             
                             # Create JavaScript audio queue player
+                            # Each clip is decoded to a Blob only when it is its turn, so the
+                            # browser never holds every clip as decoded audio at the same time.
                             audio_js = f"""
                             <div id="audio-player-container">
-                                <p id="audio-status">🎙️ กำลังเล่น 1/{len(audio_data_list)}</p>
+                                <p id="audio-status">🎙️ กำลังสร้างเสียง... (0/{len(messages_to_play)})</p>
                                 <audio id="audio-player" controls autoplay style="width: 100%;"></audio>
                             </div>
                             <script>
-                                const audioDataList = {audio_data_list};
-                                let currentIndex = 0;
+                                const host = window.parent;
+                                const queueName = {json.dumps(queue_name)};
+                                const audioQ = host[queueName] = host[queueName] || [];
+                                const total = {len(messages_to_play)};
+                                let played = 0;
+                                let playing = false;
+                                let currentUrl = null;
                                 const audioPlayer = document.getElementById('audio-player');
                                 const statusText = document.getElementById('audio-status');
                                 
+                                function releaseCurrent() {{
+                                    if (currentUrl) {{
+                                        URL.revokeObjectURL(currentUrl);
+                                        currentUrl = null;
+                                    }}
+                                }}
+                                
                                 function playNext() {{
-                                    if (currentIndex < audioDataList.length) {{
-                                        statusText.textContent = '🎙️ กำลังเล่น ' + (currentIndex + 1) + '/' + audioDataList.length;
-                                        audioPlayer.src = 'data:audio/mp3;base64,' + audioDataList[currentIndex];
-                                        audioPlayer.play();
-                                        currentIndex++;
+                                    releaseCurrent();
+                                    if (audioQ.length > 0) {{
+                                        playing = true;
+                                        const b64 = audioQ.shift();  // drop the base64 copy
+                                        played++;
+                                        statusText.textContent = '🎙️ กำลังเล่น ' + played + '/' + total;
+                                        fetch('data:audio/mp3;base64,' + b64)
+                                            .then(r => r.blob())
+                                            .then(blob => {{
+                                                currentUrl = URL.createObjectURL(blob);
+                                                audioPlayer.src = currentUrl;
+                                                audioPlayer.play();
+                                            }});
                                     }} else {{
-                                        statusText.textContent = '✅ เล่นเสร็จแล้ว!';
+                                        playing = false;
+                                        if (host[queueName + '_done']) {{
+                                            statusText.textContent = '✅ เล่นเสร็จแล้ว!';
+                                        }}
                                     }}
                                 }}
                                 
@@ -458,11 +578,48 @@ with tab3:
                                     playNext();
                                 }};
                                 
-                                // Start playing
-                                playNext();
+                                // Called by the feeders whenever a new clip arrives
+                                host[queueName + '_kick'] = function() {{
+                                    if (!playing) {{
+                                        playNext();
+                                    }}
+                                }};
+                                
+                                // Start with whatever arrived before the player loaded
+                                host[queueName + '_kick']();
                             </script>
                             """
                             st.components.v1.html(audio_js, height=100)
+                            
+                            # Synthesize in parallel but feed the player in message order,
+                            # so playback starts as soon as the first clip is ready.
+                            with ThreadPoolExecutor(max_workers=4) as executor:
+                                futures = [
+                                    executor.submit(get_message_audio, msg)
+                                    for msg in messages_to_play
+                                ]
+                                for fut in futures:
+                                    audio_bytes, _ = fut.result()
+                                    if not audio_bytes:
+                                        continue
+                                    b64 = base64.b64encode(audio_bytes).decode()
+                                    st.components.v1.html(f"""
+                                    <script>
+                                        const host = window.parent;
+                                        const queueName = {json.dumps(queue_name)};
+                                        (host[queueName] = host[queueName] || []).push({json.dumps(b64)});
+                                        if (host[queueName + '_kick']) host[queueName + '_kick']();
+                                    </script>
+                                    """, height=0)
+                            
+                            st.components.v1.html(f"""
+                            <script>
+                                const host = window.parent;
+                                const queueName = {json.dumps(queue_name)};
+                                host[queueName + '_done'] = true;
+                                if (host[queueName + '_kick']) host[queueName + '_kick']();
+                            </script>
+                            """, height=0)
                     with col_del:
                         if st.button("🗑️ ลบ", key=f"del_{debate['id']}", use_container_width=True):
                             delete_debate(debate['id'])
@@ -474,7 +631,7 @@ with tab3:
                         agent = msg['agent']
                         content = msg['content']
                         
-                        render_message_with_tts(agent, content, f"hist_view_{debate['id']}_{msg_idx}")
+                        render_message_with_tts(agent, content, f"hist_view_{debate['id']}_{msg_idx}", message=msg)
                 else:
                     st.warning("ไม่มีข้อความบันทึก")
                     
@@ -503,17 +660,12 @@ with tab4:
         col_e.metric("🔗 Edges", stats['edges'])
         
         if nodes:
-            type_color = {
-                "concept": "#5e35b1", "technique": "#e53935",
-                "risk": "#fb8c00", "defense": "#43a047", "book": "#1e88e5"
-            }
-            
             visual_nodes = [
                 Node(
                     id=str(n['id']).replace(" ", "_"),
                     label=n.get('name', n['id'])[:30],
                     size=12,
-                    color=type_color.get(n.get('type', 'concept'), "#5e35b1")
+                    color=NODE_TYPE_COLORS.get(n.get('type', 'concept'), "#5e35b1")
                 )
                 for n in nodes[:200]
             ]
@@ -532,7 +684,9 @@ with tab4:
             
             # Node search
             st.subheader("📋 รายการ Nodes")
-            search_node = st.text_input("🔍 ค้นหา", key="node_search")
+            with st.form("node_search_form"):
+                search_node = st.text_input("🔍 ค้นหา", key="node_search")
+                st.form_submit_button("ค้นหา")
             
             filtered = [n for n in nodes if search_node.lower() in n.get('name', '').lower()] if search_node else nodes
             
@@ -3,26 +3,80 @@
 Layer 1: Base Graph Extractor
 Extracts nodes and edges directly from structured JSONL fields (NO API calls needed)
 """
-import json
+import heapq
+import multiprocessing
 import os
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Generator, Tuple
+from typing import List, Dict, Generator, Set, Tuple
+from ..core import jsonl
 from ..core.schemas import (
     GraphNode, GraphEdge, BookRecord, GraphData,
     NodeType, EdgeType
 )
 
 
+# BookRecord fields by type; checked instead of full Pydantic validation
+_REQUIRED_STR_FIELDS = ("book_title", "title", "content")
+_OPTIONAL_STR_FIELDS = ("category", "chapter_title", "description", "strategy_type",
+                        "influence_level", "adaptability_level")
+_LIST_FIELDS = ("psychological_techniques", "risk_factors", "control_techniques")
+
+EXPORT_BUFFER_SIZE = 1 << 20  # bytes buffered per write() syscall in export_to_jsonl
+
+_SLUG_STRIP_RE = re.compile(r'[^\w\sก-๙]')
+_SLUG_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=65536)
 def slugify(text: str) -> str:
     """Convert text to a URL-safe slug for node IDs"""
     # Remove special characters, keep Thai and English
     text = text.lower().strip()
-    text = re.sub(r'[^\w\sก-๙]', '', text)
-    text = re.sub(r'\s+', '_', text)
+    text = _SLUG_STRIP_RE.sub('', text)
+    text = _SLUG_SPACE_RE.sub('_', text)
     return text[:100]  # Limit length
 
 
+def _is_plain_record(data: dict) -> bool:
+    """True if every BookRecord field already has the exact type the model declares"""
+    get = data.get
+    return (
+        all(isinstance(get(field), str) for field in _REQUIRED_STR_FIELDS)
+        and all(get(field) is None or isinstance(get(field), str) for field in _OPTIONAL_STR_FIELDS)
+        and all(
+            isinstance(get(field, []), list) and all(isinstance(item, str) for item in get(field, []))
+            for field in _LIST_FIELDS
+        )
+    )
+
+
+def to_book_record(data: dict) -> BookRecord:
+    """Build a BookRecord from our own JSONL, skipping Pydantic validation for well-typed rows"""
+    if _is_plain_record(data):
+        return BookRecord.model_construct(**data)
+    # Anything else gets full validation: coerced where Pydantic allows, rejected otherwise
+    return BookRecord(**data)
+
+
+def node_dict(id: str, name: str, type: NodeType, description: str = None,
+              source_book: str = None, source_chapter: str = None) -> dict:
+    """Plain-dict node with the same fields as GraphNode (much lighter in memory)"""
+    return {
+        "id": id,
+        "name": name,
+        "type": type,
+        "description": description,
+        "source_book": source_book,
+        "source_chapter": source_chapter,
+        "properties": {},
+    }
+
+
 class BaseGraphExtractor:
     """
     Layer 1: Extract base graph from structured JSONL data
@@ -33,60 +87,67 @@ class BaseGraphExtractor:
         self.data_dir = data_dir or os.path.join(
             os.path.dirname(__file__), "../../data"
         )
-        self.nodes: Dict[str, GraphNode] = {}
+        self.nodes: Dict[str, dict] = {}  # node_dict()s; GraphNode is built only on output
         self.edges: List[GraphEdge] = []
+        self._edge_keys: Set[Tuple[str, str, EdgeType]] = set()  # (source, target, type) already in self.edges
+    
+    def jsonl_files(self) -> List[Path]:
+        """List JSONL files in data directory"""
+        return list(Path(self.data_dir).glob("*.jsonl"))
+    
+    @staticmethod
+    def load_jsonl_file(jsonl_file: Path) -> Generator[BookRecord, None, None]:
+        """Load records from a single JSONL file"""
+        print(f"📖 Loading: {jsonl_file.name}")
+        
+        try:
+            for line_num, line in jsonl.iter_lines(jsonl_file):
+                try:
+                    data = jsonl.loads(line)
+                    yield to_book_record(data)
+                except jsonl.JSONDecodeError as e:
+                    print(f"  ⚠️ JSON error line {line_num}: {e}")
+                except Exception as e:
+                    print(f"  ⚠️ Parse error line {line_num}: {e}")
+        except Exception as e:
+            print(f"  ❌ File error: {e}")
     
     def load_jsonl_files(self) -> Generator[BookRecord, None, None]:
         """Load all JSONL files from data directory"""
-        data_path = Path(self.data_dir)
-        
-        for jsonl_file in data_path.glob("*.jsonl"):
-            print(f"📖 Loading: {jsonl_file.name}")
-            
-            try:
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for line_num, line in enumerate(f, 1):
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            data = json.loads(line)
-                            yield BookRecord(**data)
-                        except json.JSONDecodeError as e:
-                            print(f"  ⚠️ JSON error line {line_num}: {e}")
-                        except Exception as e:
-                            print(f"  ⚠️ Parse error line {line_num}: {e}")
-            except Exception as e:
-                print(f"  ❌ File error: {e}")
+        for jsonl_file in self.jsonl_files():
+            yield from self.load_jsonl_file(jsonl_file)
     
-    def _add_node(self, node: GraphNode):
+    def _add_node(self, node: dict):
         """Add node to collection (deduplicates by ID)"""
-        if node.id not in self.nodes:
-            self.nodes[node.id] = node
+        self.nodes.setdefault(node["id"], node)
     
     def _add_edge(self, edge: GraphEdge):
-        """Add edge to collection"""
-        # Check for duplicate edges
-        for existing in self.edges:
-            if (existing.source == edge.source and 
-                existing.target == edge.target and
-                existing.type == edge.type):
-                return
+        """Add edge to collection (deduplicates by source, target and type)"""
+        key = (edge.source, edge.target, edge.type)
+        if key in self._edge_keys:
+            return
+        self._edge_keys.add(key)
         self.edges.append(edge)
     
-    def extract_from_record(self, record: BookRecord) -> Tuple[List[GraphNode], List[GraphEdge]]:
-        """Extract nodes and edges from a single record"""
+    @staticmethod
+    def extract_from_record(record: BookRecord) -> Tuple[List[dict], List[GraphEdge]]:
+        """Extract nodes (as node dicts) and edges from a single record"""
         nodes = []
         edges = []
         
-        book_id = slugify(record.book_title)
-        chapter_id = slugify(record.chapter_title) if record.chapter_title else None
-        title_id = slugify(record.title)
+        # Hoisted once per record; used by every node/edge below
+        book_title = record.book_title
+        chapter_title = record.chapter_title
+        book_id = slugify(book_title)
+        chapter_id = slugify(chapter_title) if chapter_title else None
+        chapter_node_id = f"{book_id}_{chapter_id}"
+        concept_id = f"concept_{slugify(record.title)}"
+        risk_ids = [f"risk_{slugify(risk)}" for risk in record.risk_factors]
         
         # 1. Create Book Node
-        book_node = GraphNode(
+        book_node = node_dict(
             id=book_id,
-            name=record.book_title,
+            name=book_title,
             type=NodeType.BOOK,
             description=record.category
         )
@@ -94,105 +155,103 @@ class BaseGraphExtractor:
         
         # 2. Create Chapter Node (if exists)
         if chapter_id:
-            chapter_node = GraphNode(
-                id=f"{book_id}_{chapter_id}",
-                name=record.chapter_title,
+            chapter_node = node_dict(
+                id=chapter_node_id,
+                name=chapter_title,
                 type=NodeType.CHAPTER,
-                source_book=record.book_title
+                source_book=book_title
             )
             nodes.append(chapter_node)
             
             # Book -> Chapter edge
             edges.append(GraphEdge(
                 source=book_id,
-                target=chapter_node.id,
+                target=chapter_node_id,
                 type=EdgeType.PART_OF,
-                source_book=record.book_title
+                source_book=book_title
             ))
         
         # 3. Create Concept Node from title
-        concept_node = GraphNode(
-            id=f"concept_{title_id}",
+        concept_node = node_dict(
+            id=concept_id,
             name=record.title,
             type=NodeType.CONCEPT,
             description=record.description,
-            source_book=record.book_title,
-            source_chapter=record.chapter_title
+            source_book=book_title,
+            source_chapter=chapter_title
         )
         nodes.append(concept_node)
         
         # Link to chapter or book
         if chapter_id:
             edges.append(GraphEdge(
-                source=concept_node.id,
-                target=f"{book_id}_{chapter_id}",
+                source=concept_id,
+                target=chapter_node_id,
                 type=EdgeType.MENTIONED_IN,
-                source_book=record.book_title
+                source_book=book_title
             ))
         
         # 4. Extract Technique Nodes
         for technique in record.psychological_techniques:
             tech_id = f"tech_{slugify(technique)}"
-            tech_node = GraphNode(
+            tech_node = node_dict(
                 id=tech_id,
                 name=technique,
                 type=NodeType.TECHNIQUE,
-                source_book=record.book_title
+                source_book=book_title
             )
             nodes.append(tech_node)
             
             # Concept -> Technique edge
             edges.append(GraphEdge(
-                source=concept_node.id,
+                source=concept_id,
                 target=tech_id,
                 type=EdgeType.USES,
-                source_book=record.book_title
+                source_book=book_title
             ))
         
         # 5. Extract Risk Nodes
-        for risk in record.risk_factors:
-            risk_id = f"risk_{slugify(risk)}"
-            risk_node = GraphNode(
+        for risk, risk_id in zip(record.risk_factors, risk_ids):
+            risk_node = node_dict(
                 id=risk_id,
                 name=risk,
                 type=NodeType.RISK,
-                source_book=record.book_title
+                source_book=book_title
             )
             nodes.append(risk_node)
             
             # Concept -> Risk edge
             edges.append(GraphEdge(
-                source=concept_node.id,
+                source=concept_id,
                 target=risk_id,
                 type=EdgeType.CAUSES,
-                source_book=record.book_title
+                source_book=book_title
             ))
         
         # 6. Extract Defense/Control Nodes
         for defense in record.control_techniques:
             def_id = f"defense_{slugify(defense)}"
-            def_node = GraphNode(
+            def_node = node_dict(
                 id=def_id,
                 name=defense,
                 type=NodeType.DEFENSE,
-                source_book=record.book_title
+                source_book=book_title
             )
             nodes.append(def_node)
             
             # Defense prevents risks
-            for risk in record.risk_factors:
-                risk_id = f"risk_{slugify(risk)}"
+            for risk_id in risk_ids:
                 edges.append(GraphEdge(
                     source=def_id,
                     target=risk_id,
                     type=EdgeType.PREVENTS,
-                    source_book=record.book_title
+                    source_book=book_title
                 ))
         
         # 7. Create Outcome Node from influence_level
         if record.influence_level:
             outcome_id = f"outcome_{slugify(record.influence_level)}"
-            outcome_node = GraphNode(
+            outcome_node = node_dict(
                 id=outcome_id,
                 name=f"อิทธิพล{record.influence_level}",
                 type=NodeType.OUTCOME
@@ -200,10 +259,10 @@ class BaseGraphExtractor:
             nodes.append(outcome_node)
             
             edges.append(GraphEdge(
-                source=concept_node.id,
+                source=concept_id,
                 target=outcome_id,
                 type=EdgeType.LEADS_TO,
-                source_book=record.book_title
+                source_book=book_title
             ))
         
         return nodes, edges
@@ -212,16 +271,29 @@ class BaseGraphExtractor:
         """Extract base graph from all JSONL files"""
         print("🔄 Starting Layer 1: Base Graph Extraction...")
         
+        files = self.jsonl_files()
+        workers = min(len(files), os.cpu_count() or 1)
+        
+        # Fork only: spawn/forkserver workers re-import app.core (and the calling script),
+        # which opens a new Neo4j connection in every worker. Without fork, run in-process.
+        if "fork" not in multiprocessing.get_all_start_methods():
+            workers = 1
+        
+        if workers > 1:
+            # One worker per file; map() keeps file order so first-seen nodes win as before
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("fork")) as pool:
+                results = list(pool.map(_extract_file, files))
+        else:
+            results = [_extract_file(f) for f in files]
+        
         record_count = 0
-        for record in self.load_jsonl_files():
-            nodes, edges = self.extract_from_record(record)
-            
-            for node in nodes:
-                self._add_node(node)
+        for count, nodes, edges in results:
+            for node_id, node in nodes.items():
+                self.nodes.setdefault(node_id, node)
             for edge in edges:
                 self._add_edge(edge)
-            
-            record_count += 1
+            record_count += count
         
         print(f"\n✅ Layer 1 Complete!")
         print(f"   📊 Records processed: {record_count}")
@@ -229,47 +301,54 @@ class BaseGraphExtractor:
         print(f"   🔗 Edges extracted: {len(self.edges)}")
         
         return GraphData(
-            nodes=list(self.nodes.values()),
+            nodes=[GraphNode(**node) for node in self.nodes.values()],
             edges=self.edges
         )
     
     def get_top_concepts(self, n: int = 25) -> List[GraphNode]:
         """Get top N concepts for debate selection"""
-        concepts = [
-            node for node in self.nodes.values() 
-            if node.type == NodeType.CONCEPT
-        ]
-        
-        # Sort by number of edges connected
-        edge_counts = {}
-        for edge in self.edges:
-            edge_counts[edge.source] = edge_counts.get(edge.source, 0) + 1
-            edge_counts[edge.target] = edge_counts.get(edge.target, 0) + 1
+        # Rank by number of edges connected
+        edge_counts = Counter(chain.from_iterable(
+            (edge.source, edge.target) for edge in self.edges
+        ))
         
-        concepts.sort(key=lambda c: edge_counts.get(c.id, 0), reverse=True)
-        
-        return concepts[:n]
+        concepts = (
+            node for node in self.nodes.values() 
+            if node["type"] is NodeType.CONCEPT  # node_dict() stores enum members
+        )
+        top = heapq.nlargest(n, concepts, key=lambda c: edge_counts[c["id"]])
+        return [GraphNode(**node) for node in top]
     
     def export_to_jsonl(self, filepath: str):
         """Export graph data to JSONL file"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            # Export nodes
-            for node in self.nodes.values():
-                f.write(json.dumps({
-                    "type": "node",
-                    "data": node.model_dump()
-                }, ensure_ascii=False) + "\n")
-            
-            # Export edges
-            for edge in self.edges:
-                f.write(json.dumps({
-                    "type": "edge",
-                    "data": edge.model_dump()
-                }, ensure_ascii=False) + "\n")
+        # Nodes first, then edges; one buffered writelines instead of a write per line
+        lines = chain(
+            (jsonl.dumps_line({"type": "node", "data": node}) for node in self.nodes.values()),
+            (jsonl.dumps_line({"type": "edge", "data": edge.model_dump(mode="json")}) for edge in self.edges),
+        )
+        with open(filepath, 'wb', buffering=EXPORT_BUFFER_SIZE) as f:
+            f.writelines(lines)
         
         print(f"✅ Exported to {filepath}")
 
 
+def _extract_file(jsonl_file: Path) -> Tuple[int, Dict[str, dict], List[GraphEdge]]:
+    """Extract one JSONL file (runs in a worker process); returns (record_count, nodes, edges)"""
+    extractor = BaseGraphExtractor()
+    record_count = 0
+    for record in extractor.load_jsonl_file(jsonl_file):
+        nodes, edges = extractor.extract_from_record(record)
+        
+        for node in nodes:
+            extractor._add_node(node)
+        for edge in edges:
+            extractor._add_edge(edge)
+        
+        record_count += 1
+    
+    return record_count, extractor.nodes, extractor.edges
+
+
 # Convenience function
 def extract_base_graph(data_dir: str = None) -> GraphData:
     """Extract base graph from JSONL files"""
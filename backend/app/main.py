@@ -2,6 +2,8 @@
 """
 FastAPI Backend for Knowledge Graph API
 """
+import asyncio
+
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List
@@ -30,6 +32,26 @@ app.add_middleware(
 )
 
 
+# ==================== Startup ====================
+
+_warmup_task: Optional[asyncio.Task] = None
+
+
+def _warm_debate_system():
+    """Load embedding model + RAG index so the first debate request doesn't pay for it"""
+    try:
+        get_enhanced_debate(data_dir="data")
+    except Exception as e:
+        print(f"⚠️ Debate system warmup failed: {e}")
+
+
+@app.on_event("startup")
+async def warmup():
+    """Start loading the debate system in a background thread"""
+    global _warmup_task
+    _warmup_task = asyncio.create_task(asyncio.to_thread(_warm_debate_system))
+
+
 # ==================== Response Models ====================
 
 class GraphResponse(BaseModel):
@@ -106,7 +128,7 @@ async def search_nodes(
 ):
     """Search nodes by name or description"""
     try:
-        results = neo4j_client.search_nodes(q, limit)
+        results = await asyncio.to_thread(neo4j_client.search_nodes, q, limit)
         return SearchResponse(results=results, count=len(results))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -132,7 +154,8 @@ async def trigger_debate(request: DebateRequest):
     try:
         content = request.content or request.topic
         
-        session = debate_orchestrator.debate_topic(
+        session = await asyncio.to_thread(
+            debate_orchestrator.debate_topic,
             topic=request.topic,
             content=content
         )
@@ -163,9 +186,10 @@ async def trigger_enhanced_debate(request: EnhancedDebateRequest):
     - 1 Analyst agent extracts knowledge graph
     """
     try:
-        debate_system = get_enhanced_debate(data_dir="data")
+        debate_system = await asyncio.to_thread(get_enhanced_debate, data_dir="data")
         
-        result = debate_system.run_debate(
+        result = await asyncio.to_thread(
+            debate_system.run_debate,
             topic=request.topic,
             rounds=request.rounds,
             delay=1.0
@@ -3,13 +3,15 @@
 Embedding-based RAG using local models
 Supports: BAAI-bge-m3, intfloat-multilingual-e5-large
 """
-import json
 import os
 import pickle
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 import numpy as np
 
+from ..core import jsonl
+
 try:
     from sentence_transformers import SentenceTransformer
     import faiss
@@ -18,6 +20,47 @@ except ImportError:
     HAS_EMBEDDINGS = False
     print("⚠️ sentence-transformers or faiss not installed")
 
+# Optional: columnar document cache (falls back to pickle)
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# Documents per encode call when building the index (library default is 32)
+ENCODE_BATCH_SIZE = 256
+
+# HNSW graph parameters: neighbors per node, build-time and query-time beam width
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Query-side encoding: distinct queries kept in the LRU cache
+QUERY_CACHE_SIZE = 1024
+
+
+class ArrowDocuments:
+    """
+    Read-only list view over the cached documents table
+    Rows are turned into dicts only when accessed (e.g. for search results)
+    """
+    
+    def __init__(self, table: "pa.Table"):
+        self._table = table
+    
+    def __len__(self) -> int:
+        return self._table.num_rows
+    
+    def __getitem__(self, idx: int) -> dict:
+        doc = self._table.slice(int(idx), 1).to_pylist()[0]
+        doc['metadata'] = jsonl.loads(doc['metadata'])
+        return doc
+    
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
 
 class EmbeddingRAG:
     """RAG system using local embedding models and FAISS vector store"""
@@ -34,10 +77,13 @@ class EmbeddingRAG:
         self.cache_dir.mkdir(exist_ok=True)
         
         self.model: Optional[SentenceTransformer] = None
-        self.index: Optional[faiss.IndexFlatIP] = None  # Inner product (cosine sim after norm)
-        self.documents: List[dict] = []
+        self.index: Optional[faiss.Index] = None  # Inner product (cosine sim after norm)
+        self.documents: Union[List[dict], ArrowDocuments] = []
         self.embeddings: Optional[np.ndarray] = None
         
+        # Per-instance LRU cache of query embeddings (callers must not modify the arrays)
+        self._encode_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._encode_query_uncached)
+        
         self._initialized = False
     
     def initialize(self, force_rebuild: bool = False):
@@ -53,13 +99,17 @@ class EmbeddingRAG:
         # Load embedding model
         print(f"  📦 Loading model: {Path(self.model_path).name}")
         self.model = SentenceTransformer(self.model_path)
+        self._encode_query.cache_clear()
         print(f"     Dimension: {self.model.get_sentence_embedding_dimension()}")
         
         # Check cache
         index_path = self.cache_dir / "faiss.index"
-        docs_path = self.cache_dir / "documents.pkl"
+        docs_cached = (
+            (HAS_ARROW and (self.cache_dir / "documents.arrow").exists())
+            or (self.cache_dir / "documents.pkl").exists()
+        )
         
-        if not force_rebuild and index_path.exists() and docs_path.exists():
+        if not force_rebuild and index_path.exists() and docs_cached:
             print(f"  💾 Loading cached index...")
             self._load_cache()
         else:
@@ -76,25 +126,21 @@ class EmbeddingRAG:
         for jsonl_file in self.data_dir.glob("*.jsonl"):
             book_name = jsonl_file.stem
             try:
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for line_num, line in enumerate(f, 1):
-                        if line.strip():
-                            entry = json.loads(line)
-                            
-                            # Create document with searchable text
-                            title = entry.get('title', '') or entry.get('name', '')
-                            content = entry.get('content', '') or entry.get('description', '')
-                            
-                            if title or content:
-                                text = f"{title}\n{content}".strip()
-                                documents.append({
-                                    'id': f"{book_name}_{line_num}",
-                                    'book': book_name,
-                                    'title': title,
-                                    'content': content[:2000],  # Limit length
-                                    'text': text[:1000],  # For embedding
-                                    'metadata': entry
-                                })
+                for line_num, line in jsonl.iter_lines(jsonl_file):
+                    entry = jsonl.loads(line)
+                    
+                    # Create document with searchable text
+                    title = entry.get('title', '') or entry.get('name', '')
+                    content = entry.get('content', '') or entry.get('description', '')
+                    
+                    if title or content:
+                        documents.append({
+                            'id': f"{book_name}_{line_num}",
+                            'book': book_name,
+                            'title': title,
+                            'content': content[:2000],  # Limit length of prompt context
+                            'metadata': entry
+                        })
             except Exception as e:
                 print(f"  ⚠️ Error loading {jsonl_file.name}: {e}")
         
@@ -112,20 +158,30 @@ class EmbeddingRAG:
         
         # Create embeddings
         print(f"     Creating embeddings...")
-        texts = [doc['text'] for doc in self.documents]
+        # No char slicing: the tokenizer truncates to the model's max_seq_length
+        texts = [f"{doc['title']}\n{doc['content']}".strip() for doc in self.documents]
         
         # Batch encode for efficiency
-        self.embeddings = self.model.encode(
+        embeddings = self.model.encode(
             texts,
+            batch_size=ENCODE_BATCH_SIZE,
             show_progress_bar=True,
             convert_to_numpy=True,
             normalize_embeddings=True  # For cosine similarity
-        )
+        ).astype('float32')
         
-        # Build FAISS index
-        dimension = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product = cosine after normalization
-        self.index.add(self.embeddings.astype('float32'))
+        # Build FAISS index: HNSW graph for sub-linear search over fp16 vectors
+        # (half the RAM and bandwidth of fp32)
+        dimension = embeddings.shape[1]
+        self.index = faiss.IndexHNSWSQ(
+            dimension, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT
+        )  # Inner product = cosine after normalization
+        self.index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        self.index.add(embeddings)
+        self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        
+        # Normalized vectors lose nothing meaningful in fp16
+        self.embeddings = embeddings.astype(np.float16)
         
         # Save cache
         self._save_cache()
@@ -134,43 +190,52 @@ class EmbeddingRAG:
     def _save_cache(self):
         """Save index and documents to cache"""
         faiss.write_index(self.index, str(self.cache_dir / "faiss.index"))
-        with open(self.cache_dir / "documents.pkl", 'wb') as f:
-            pickle.dump(self.documents, f)
+        
+        arrow_path = self.cache_dir / "documents.arrow"
+        pickle_path = self.cache_dir / "documents.pkl"
+        if HAS_ARROW:
+            # metadata differs per book, so it is stored as a JSON column
+            table = pa.Table.from_pylist([
+                {**doc, 'metadata': jsonl.dumps(doc['metadata'])}
+                for doc in self.documents
+            ])
+            feather.write_feather(table, str(arrow_path), compression='zstd')
+            pickle_path.unlink(missing_ok=True)
+        else:
+            with open(pickle_path, 'wb') as f:
+                pickle.dump(self.documents, f)
+            arrow_path.unlink(missing_ok=True)
+        
         np.save(self.cache_dir / "embeddings.npy", self.embeddings)
     
     def _load_cache(self):
         """Load index and documents from cache"""
         self.index = faiss.read_index(str(self.cache_dir / "faiss.index"))
-        with open(self.cache_dir / "documents.pkl", 'rb') as f:
-            self.documents = pickle.load(f)
-        self.embeddings = np.load(self.cache_dir / "embeddings.npy")
-    
-    def search(
-        self, 
-        query: str, 
-        top_k: int = 5,
-        min_score: float = 0.3
-    ) -> List[Dict]:
-        """Search for relevant documents"""
-        if not self._initialized:
-            self.initialize()
+        if hasattr(self.index, "hnsw"):  # older caches hold a flat index
+            self.index.hnsw.efSearch = HNSW_EF_SEARCH
         
-        if not self.index or not self.documents:
-            return []
+        arrow_path = self.cache_dir / "documents.arrow"
+        if HAS_ARROW and arrow_path.exists():
+            self.documents = ArrowDocuments(feather.read_table(str(arrow_path)))
+        else:
+            with open(self.cache_dir / "documents.pkl", 'rb') as f:
+                self.documents = pickle.load(f)
         
-        # Encode query
-        query_embedding = self.model.encode(
+        # Memory-mapped: pages are read on demand instead of loading the whole matrix
+        self.embeddings = np.load(self.cache_dir / "embeddings.npy", mmap_mode='r')
+    
+    def _encode_query_uncached(self, query: str) -> np.ndarray:
+        """Encode one query as a (1, dim) float32 matrix"""
+        return self.model.encode(
             [query],
             convert_to_numpy=True,
             normalize_embeddings=True
         ).astype('float32')
-        
-        # Search
-        scores, indices = self.index.search(query_embedding, top_k)
-        
-        # Format results
+    
+    def _format_results(self, scores, indices, min_score: float) -> List[Dict]:
+        """Turn one row of FAISS output into result dicts"""
         results = []
-        for score, idx in zip(scores[0], indices[0]):
+        for score, idx in zip(scores, indices):
             if idx < 0 or score < min_score:
                 continue
             
@@ -185,6 +250,27 @@ class EmbeddingRAG:
         
         return results
     
+    def search(
+        self, 
+        query: str, 
+        top_k: int = 5,
+        min_score: float = 0.3
+    ) -> List[Dict]:
+        """Search for relevant documents"""
+        if not self._initialized:
+            self.initialize()
+        
+        if not self.index or not self.documents:
+            return []
+        
+        # Encode query (topics are re-queried often, so embeddings are cached)
+        query_embedding = self._encode_query(query)
+        
+        # Search
+        scores, indices = self.index.search(query_embedding, top_k)
+        
+        return self._format_results(scores[0], indices[0], min_score)
+    
     def get_context(self, query: str, top_k: int = 3) -> str:
         """Get formatted context for LLM prompt"""
         results = self.search(query, top_k=top_k)
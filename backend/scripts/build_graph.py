@@ -76,13 +76,14 @@ def ingest_to_neo4j(nodes, edges):
     print("📥 Ingesting to Neo4j")
     print("="*60)
     
-    # Create nodes
+    # Create nodes (all nodes first - edges MATCH their endpoints).
+    # The client commits UNWIND_BATCH_SIZE rows per transaction.
     node_count = neo4j_client.create_nodes_batch(nodes)
-    print(f"   ✅ Created {node_count} nodes")
+    print(f"   ✅ Created {node_count} of {len(nodes)} nodes")
     
     # Create edges
     edge_count = neo4j_client.create_edges_batch(edges)
-    print(f"   ✅ Created {edge_count} edges")
+    print(f"   ✅ Created {edge_count} of {len(edges)} edges")
     
     # Get stats
     stats = neo4j_client.get_stats()
@@ -118,7 +119,7 @@ def main():
     
     # Layer 1: Base extraction (always runs)
     extractor, graph_data = run_layer1(args.data_dir)
-    all_nodes.extend(graph_data.nodes)
+    all_nodes.extend(extractor.nodes.values())  # plain node dicts go to Neo4j as-is
     all_edges.extend(graph_data.edges)
     
     # Layer 2: Enrichment (if requested)
@@ -1,72 +1,231 @@
 import os
 import sys
 import json
+import mmap
+import re
 import shutil
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
 
 # Add parent dir to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     import pdfplumber
+    from pdfminer.pdftypes import resolve1
 except ImportError:
     pdfplumber = None
 
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Not app.core.jsonl: importing app.core would connect to Neo4j
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 DATA_DIR = Path("data")
 CACHE_DIR = Path(".rag_cache")
 
-def convert_txt_to_jsonl(txt_path: Path):
-    print(f"📄 Processing TXT: {txt_path.name}")
-    content = txt_path.read_text(encoding='utf-8')
+MAX_CHUNK_CHARS = 1500  # chunks are packed up to this size; longer text is split at sentences
+MIN_CHUNK_CHARS = 50    # a shorter final chunk is merged into the previous one
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?。])\s+')
+# Paragraph break: 2+ newlines with any whitespace (\r, spaces, form feeds) between them
+_PARA_RE = re.compile(rb'(?:\r?\n\s*){2,}')
+_WS_RE = re.compile(r'[ \t\f\v]+')
+
+def _clean_paragraph(raw: bytes) -> str:
+    """Decode one raw paragraph, collapse runs of spaces/tabs and strip each line"""
+    lines = (_WS_RE.sub(' ', line).strip() for line in raw.decode('utf-8').splitlines())
+    return "\n".join(line for line in lines if line)
+
+def _iter_paragraphs(txt_path: Path) -> Iterator[str]:
+    """Yield blank-line separated paragraphs, scanning a memory map of the file"""
+    with open(txt_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return  # mmap can't map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Only each paragraph's bytes are copied out and decoded, never the whole file
+            start = 0
+            for match in _PARA_RE.finditer(mm):
+                paragraph = _clean_paragraph(mm[start:match.start()])
+                if paragraph:
+                    yield paragraph
+                start = match.end()
+            paragraph = _clean_paragraph(mm[start:])
+            if paragraph:
+                yield paragraph
+
+def _split_long(text: str, max_chars: int) -> Iterator[str]:
+    """Split text longer than max_chars into pieces at sentence (or word) boundaries, else hard cuts"""
+    if len(text) <= max_chars:
+        yield text
+        return
     
-    # Simple chunking by paragraphs
-    chunks = [c.strip() for c in content.split('\n\n') if c.strip()]
+    piece = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        # Thai has no sentence punctuation; fall back to splitting on spaces
+        parts = sentence.split(" ") if len(sentence) > max_chars else [sentence]
+        # Unspaced Thai runs can still be too long: cut them at max_chars
+        parts = (p[i:i + max_chars] for p in parts for i in range(0, len(p), max_chars))
+        for part in parts:
+            if piece and len(piece) + 1 + len(part) > max_chars:
+                yield piece
+                piece = part
+            else:
+                piece = f"{piece} {part}" if piece else part
+    if piece:
+        yield piece
+
+def _balance(chunks: Iterable[str], max_chars: int = MAX_CHUNK_CHARS,
+             min_chars: int = MIN_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Single pass over chunks: pack them into pieces of up to max_chars,
+    splitting long ones at sentence boundaries; a tail under min_chars joins the previous piece
+    (so the last piece can exceed max_chars by up to min_chars)
+    """
+    buf = ""
+    held = None  # last full piece, held back so a tiny tail can still be merged into it
+    for chunk in chunks:
+        for part in _split_long(chunk, max_chars):
+            if buf and len(buf) + 1 + len(part) > max_chars:
+                if held is not None:
+                    yield held
+                held, buf = buf, part
+            else:
+                buf = f"{buf}\n{part}" if buf else part
     
+    if buf and held is not None and len(buf) < min_chars:
+        held, buf = f"{held}\n{buf}", ""
+    if held is not None:
+        yield held
+    if buf:
+        yield buf
+
+@contextmanager
+def _open_output(output_path: Path):
+    """
+    Open output_path.tmp for streamed writing; it replaces output_path only on success.
+    On any error (or Ctrl-C) the partial file is removed, so main() retries the book next run
+    """
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with open(tmp_path, 'wb', buffering=1 << 20) as f:
+            yield f
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def convert_txt_to_jsonl(txt_path: Path) -> bool:
+    print(f"📄 Processing TXT: {txt_path.name}")
     output_path = DATA_DIR / f"{txt_path.stem}.jsonl"
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for i, chunk in enumerate(chunks):
-            if len(chunk) < 50: continue # Skip tiny chunks
-            
+    # Streamed: only the current paragraph is held in memory
+    section_count = 0
+    with _open_output(output_path) as f:
+        for chunk in _balance(_iter_paragraphs(txt_path)):
+            section_count += 1
             entry = {
-                "title": f"Section {i+1}",
+                "title": f"Section {section_count}",
                 "content": chunk,
                 "source": txt_path.name
             }
-            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.write(_dumps_line(entry))
             
-    print(f"   ✅ Converted to {output_path.name} ({len(chunks)} sections)")
+    print(f"   ✅ Converted to {output_path.name} ({section_count} sections)")
+    return True
+
+def _dumps_line(entry: dict) -> bytes:
+    """Serialize entry as one UTF-8 JSONL line"""
+    if orjson:
+        return orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+# Per worker process: the PDF is opened (xref parsed) once, not once per page.
+# Released when the worker process exits.
+_PDF = None
+
+def _init_pdf_worker(pdf_path: str):
+    """ProcessPoolExecutor initializer: open the PDF for this worker"""
+    global _PDF
+    _PDF = pdfplumber.open(pdf_path)
 
-def convert_pdf_to_jsonl(pdf_path: Path):
+def _may_have_text(page) -> bool:
+    """
+    Cheap check on the page's resource dict, without interpreting its content stream:
+    text needs a font, either in the page's /Font or inside a form XObject (checked conservatively)
+    """
+    resources = resolve1(page.page_obj.resources) or {}
+    if resolve1(resources.get("Font")):
+        return True
+    xobjects = resolve1(resources.get("XObject")) or {}
+    return any(
+        getattr(resolve1(xobj).get("Subtype"), "name", None) == "Form"
+        for xobj in xobjects.values()
+    )
+
+def _extract_page(page_no: int) -> Tuple[int, Optional[str]]:
+    """Extract text of one PDF page (runs in a worker process); None for pages that cannot hold text"""
+    page = _PDF.pages[page_no]
+    try:
+        # Scanned/image-only page (no fonts): skip parsing its content stream at all
+        if not _may_have_text(page):
+            return page_no, None
+        return page_no, page.extract_text() or ""
+    finally:
+        page.flush_cache()  # the shared PDF would otherwise keep every parsed page alive
+
+def convert_pdf_to_jsonl(pdf_path: Path) -> bool:
     if not pdfplumber:
         print(f"⚠️  Skipping {pdf_path.name}: pdfplumber not installed. Run `pip install pdfplumber`.")
-        return
+        return False
 
     print(f"📕 Processing PDF: {pdf_path.name}")
     output_path = DATA_DIR / f"{pdf_path.stem}.jsonl"
     
-    entries = []
     with pdfplumber.open(pdf_path) as pdf:
         total_pages = len(pdf.pages)
-        print(f"   Scanned {total_pages} pages...")
+    print(f"   Scanned {total_pages} pages...")
+    
+    # Pages are independent: extract them in parallel, write them back in page order
+    page_count = 0
+    skipped = 0
+    with _open_output(output_path) as f, \
+            ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_pdf_worker,
+                                initargs=(str(pdf_path),)) as pool:
+        pages = pool.map(_extract_page, range(total_pages), chunksize=8)
+        if tqdm:
+            pages = tqdm(pages, total=total_pages, unit="pg", desc=pdf_path.stem)
         
-        for i, page in enumerate(pdf.pages):
-            text = page.extract_text()
+        for i, text in pages:
+            if text is None:
+                skipped += 1
+                continue
             if not text: continue
             
-            # Simple chunking: 1 page = 1 chunk (can be improved)
-            entries.append({
-                "title": f"Page {i+1}",
-                "content": text.strip(),
-                "source": pdf_path.name,
-                "page": i+1
-            })
-            
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for entry in entries:
-            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            # 1 page = 1 chunk, unless the page is too long for one
+            for chunk in _balance([text.strip()]):
+                entry = {
+                    "title": f"Page {i+1}",
+                    "content": chunk,
+                    "source": pdf_path.name,
+                    "page": i+1
+                }
+                f.write(_dumps_line(entry))
+            page_count += 1
             
-    print(f"   ✅ Converted to {output_path.name} ({len(entries)} pages)")
+    print(f"   ✅ Converted to {output_path.name} ({page_count} pages)")
+    if skipped:
+        print(f"   ⏭️ Skipped {skipped} pages without fonts (scanned/image-only)")
+    return True
 
 def main():
     print("📚 Book Ingestion Script")
@@ -77,21 +236,23 @@ def main():
     
     files_processed = 0
     
-    for file_path in DATA_DIR.glob("*"):
-        if file_path.suffix.lower() == '.txt':
-            jsonl_path = DATA_DIR / f"{file_path.stem}.jsonl"
-            if not jsonl_path.exists():
-                convert_txt_to_jsonl(file_path)
-                files_processed += 1
-                
-        elif file_path.suffix.lower() == '.pdf':
-            jsonl_path = DATA_DIR / f"{file_path.stem}.jsonl"
-            if not jsonl_path.exists():
-                convert_pdf_to_jsonl(file_path)
-                files_processed += 1
+    # One directory scan: stem -> {suffix: path}, no per-file exists() stat
+    stems = defaultdict(dict)
+    with os.scandir(DATA_DIR) as it:
+        for entry in it:
+            stem, suffix = os.path.splitext(entry.name)
+            stems[stem][suffix.lower()] = entry.path
+    
+    for stem, files in stems.items():
+        if '.jsonl' in files:
+            continue
+        if '.pdf' in files:
+            files_processed += convert_pdf_to_jsonl(Path(files['.pdf']))
+        elif '.txt' in files:
+            files_processed += convert_txt_to_jsonl(Path(files['.txt']))
     
     # Count total JSONL files
-    total_jsonl = len(list(DATA_DIR.glob("*.jsonl")))
+    total_jsonl = sum('.jsonl' in files for files in stems.values()) + files_processed
     print(f"\n📊 Total Library Size: {total_jsonl} books (JSONL)")
 
     if files_processed > 0:
@@ -7,13 +7,22 @@ import sys
 import os
 import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, redirect_stdout
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.agents.enhanced_debate import get_enhanced_debate
-from app.core.neo4j_client import neo4j_client
+# app.* imports (agents, embedding model, Neo4j connection) are deferred until a debate
+# actually runs, so --help / --reset / "nothing left to do" return immediately
+
+try:
+    from tqdm import tqdm
+    from tqdm.contrib import DummyTqdmFile
+except ImportError:
+    tqdm = None  # plain [i/N] + ETA prints instead of a progress bar
 
 # ============================================
 # Configuration
@@ -27,41 +36,61 @@ DELAY_AFTER_ERROR = 60  # seconds
 COMPLETED_LOG = "scripts/completed_topics.txt"
 
 
-def load_topics(topics_file: str) -> list:
-    """Load topics from txt file (one per line, # = comment)"""
+@lru_cache(maxsize=4)
+def _parse_topics_cached(path: str, mtime_ns: int, size: int) -> tuple:
+    """Parse a topics file; mtime/size are part of the cache key so edits are picked up"""
     topics = []
-    path = Path(topics_file)
-    
-    if not path.exists():
-        print(f"❌ File not found: {topics_file}")
-        return []
+    seen = set()
     
     with open(path, 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
-            if line and not line.startswith('#'):
+            if line and not line.startswith('#') and line not in seen:
+                seen.add(line)
                 topics.append(line)
     
-    return topics
+    return tuple(topics)
+
+
+def load_topics(topics_file: str) -> list:
+    """Load topics from txt file (one per line, # = comment, duplicates dropped)"""
+    path = Path(topics_file)
+    
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        print(f"❌ File not found: {topics_file}")
+        return []
+    
+    return list(_parse_topics_cached(str(path.resolve()), stat.st_mtime_ns, stat.st_size))
 
 
 def load_completed() -> set:
     """Load list of completed topics"""
-    completed = set()
-    path = Path(COMPLETED_LOG)
-    
-    if path.exists():
-        with open(path, 'r', encoding='utf-8') as f:
-            for line in f:
-                completed.add(line.strip())
+    try:
+        text = Path(COMPLETED_LOG).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return set()
     
-    return completed
+    return set(filter(None, map(str.strip, text.splitlines())))
 
 
-def save_completed(topic: str):
-    """Append topic to completed log"""
-    with open(COMPLETED_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"{topic}\n")
+def save_to_neo4j(nodes: list, edges: list) -> tuple:
+    """Save debate nodes/edges with one UNWIND batch each; returns (saved_nodes, saved_edges)"""
+    from app.core.neo4j_client import neo4j_client
+    
+    saved_n = neo4j_client.create_nodes_batch(nodes)
+    if saved_n < len(nodes):
+        # Batch failed: retry row by row (MERGE is idempotent) to keep the good rows
+        print("  ⚠️ Node batch failed, retrying one by one...")
+        saved_n = sum(neo4j_client.create_node(node) for node in nodes)
+    
+    saved_e = neo4j_client.create_edges_batch(edges)
+    if saved_e < len(edges):
+        print("  ⚠️ Edge batch failed, retrying one by one...")
+        saved_e = sum(neo4j_client.create_edge(edge) for edge in edges)
+    
+    return saved_n, saved_e
 
 
 def format_eta(seconds: float) -> str:
@@ -78,7 +107,8 @@ def run_auto_debate(
     topics_file: str = DEFAULT_TOPICS_FILE,
     delay_between_topics: int = DEFAULT_DELAY_BETWEEN_TOPICS,
     rounds: int = DEFAULT_ROUNDS,
-    resume: bool = True
+    resume: bool = True,
+    sort_by_length: bool = False
 ):
     """
     Run automated debates on all topics
@@ -88,6 +118,7 @@ def run_auto_debate(
         delay_between_topics: Seconds to wait between each topic
         rounds: Number of debate rounds per topic
         resume: Skip already completed topics
+        sort_by_length: Run shortest topics first (ETA still assumes equal weight per topic)
     """
     print("=" * 60)
     print("🤖 AUTO DEBATE SYSTEM")
@@ -107,6 +138,8 @@ def run_auto_debate(
     # Filter completed if resume mode
     completed = load_completed() if resume else set()
     topics = [t for t in all_topics if t not in completed]
+    if sort_by_length:
+        topics.sort(key=len)
     
     print(f"\n📋 Topics: {len(all_topics)} total, {len(completed)} completed, {len(topics)} remaining")
     
@@ -116,6 +149,9 @@ def run_auto_debate(
     
     # Initialize system
     print("\n🚀 Initializing AI System...")
+    from app.agents.enhanced_debate import get_enhanced_debate
+    from app.core.neo4j_client import neo4j_client
+    
     debate_system = get_enhanced_debate(data_dir="data")
     
     # Calculate ETA
@@ -128,63 +164,59 @@ def run_auto_debate(
     total_edges = 0
     start_time = datetime.now()
     
-    # Run debates
-    for i, topic in enumerate(topics):
-        current = i + 1
-        remaining = len(topics) - current
-        eta_seconds = remaining * est_time_per_topic
-        
-        print(f"\n{'='*60}")
-        print(f"📌 [{current}/{len(topics)}] {topic}")
-        print(f"   ⏳ ETA: {format_eta(eta_seconds)}")
-        print(f"{'='*60}")
-        
-        try:
-            result = debate_system.run_debate(
-                topic=topic,
-                rounds=rounds,
-                delay=DEFAULT_DELAY_BETWEEN_ROUNDS
-            )
-            
-            nodes = result['nodes']
-            edges = result['edges']
-            
-            # Save to Neo4j
-            print(f"\n💾 Saving to Neo4j...")
-            saved_n, saved_e = 0, 0
-            
-            for node in nodes:
-                try:
-                    neo4j_client.create_node(node)
-                    saved_n += 1
-                except Exception as e:
-                    print(f"  ⚠️ Node error: {e}")
+    # Run debates (completed log stays open; line-buffered so each topic is on disk right away).
+    # Neo4j saves run on a background thread so they overlap the rate-limit delay.
+    # With a progress bar, every print goes through tqdm.write so the bar stays below the log.
+    bar_out = sys.stdout
+    with open(COMPLETED_LOG, 'a', encoding='utf-8', buffering=1) as completed_log, \
+            ThreadPoolExecutor(max_workers=1) as save_executor, \
+            (redirect_stdout(DummyTqdmFile(bar_out)) if tqdm else nullcontext()):
+        for i, topic in enumerate(tqdm(topics, unit="topic", file=bar_out) if tqdm else topics):
+            current = i + 1
+            remaining = len(topics) - current
+            eta_seconds = remaining * est_time_per_topic
             
-            for edge in edges:
-                try:
-                    neo4j_client.create_edge(edge)
-                    saved_e += 1
-                except Exception as e:
-                    print(f"  ⚠️ Edge error: {e}")
+            print(f"\n{'='*60}")
+            if tqdm:
+                print(f"📌 {topic}")  # count and ETA are on the progress bar
+            else:
+                print(f"📌 [{current}/{len(topics)}] {topic}")
+                print(f"   ⏳ ETA: {format_eta(eta_seconds)}")
+            print(f"{'='*60}")
             
-            total_nodes += saved_n
-            total_edges += saved_e
-            
-            print(f"✅ Saved: {saved_n} nodes, {saved_e} edges")
-            
-            # Mark completed
-            save_completed(topic)
-            
-            # Delay before next topic
-            if remaining > 0:
-                print(f"\n⏸️  Waiting {delay_between_topics}s before next topic...")
-                time.sleep(delay_between_topics)
-            
-        except Exception as e:
-            print(f"❌ Error on '{topic}': {e}")
-            print(f"⏸️  Cooling down for {DELAY_AFTER_ERROR}s...")
-            time.sleep(DELAY_AFTER_ERROR)
-            continue
+            try:
+                result = debate_system.run_debate(
+                    topic=topic,
+                    rounds=rounds,
+                    delay=DEFAULT_DELAY_BETWEEN_ROUNDS
+                )
+                
+                nodes = result['nodes']
+                edges = result['edges']
+                
+                # Save to Neo4j (in the background while we wait)
+                print(f"\n💾 Saving to Neo4j...")
+                save_future = save_executor.submit(save_to_neo4j, nodes, edges)
+                
+                # Delay before next topic
+                if remaining > 0:
+                    print(f"\n⏸️  Waiting {delay_between_topics}s before next topic...")
+                    time.sleep(delay_between_topics)
+                
+                saved_n, saved_e = save_future.result()
+                total_nodes += saved_n
+                total_edges += saved_e
+                
+                print(f"✅ Saved: {saved_n} nodes, {saved_e} edges")
+                
+                # Mark completed
+                completed_log.write(f"{topic}\n")
+                
+            except Exception as e:
+                print(f"❌ Error on '{topic}': {e}")
+                print(f"⏸️  Cooling down for {DELAY_AFTER_ERROR}s...")
+                time.sleep(DELAY_AFTER_ERROR)
+                continue
     
     # Final stats
     elapsed = datetime.now() - start_time
@@ -233,6 +265,11 @@ def main():
         action='store_true',
         help='Disable resume mode (re-run completed topics)'
     )
+    parser.add_argument(
+        '--sort-by-length',
+        action='store_true',
+        help='Run shortest topics first (default: file order)'
+    )
     parser.add_argument(
         '--reset',
         action='store_true',
@@ -252,7 +289,8 @@ def main():
         topics_file=args.file,
         delay_between_topics=args.delay,
         rounds=args.rounds,
-        resume=not args.no_resume
+        resume=not args.no_resume,
+        sort_by_length=args.sort_by_length
     )
 
 
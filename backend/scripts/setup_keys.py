@@ -1,5 +1,6 @@
-import os
+import re
 import sys
+from pathlib import Path
 
 def main():
     print("🔑 API Key Setup (Multi-Key Support)")
@@ -7,17 +8,22 @@ def main():
     print("Add multiple Google API keys to avoid rate limits.")
     print("The system will automatically rotate keys if one hits the limit.\n")
     
-    print("Paste your keys one by one (press Enter after each).")
-    print("Type 'done' when finished.\n")
+    print("Paste all your keys at once (separated by spaces, commas or newlines).")
+    print("Finish with an empty line or Ctrl-D.\n")
     
-    keys = []
-    while True:
-        key = input(f"Enter Key #{len(keys)+1}: ").strip()
-        if key.lower() == 'done':
-            break
-        if key:
-            keys.append(key)
-            print(f"   ✅ Added Key #{len(keys)}")
+    # Read the whole paste block; an empty line ends it once something was pasted
+    lines = []
+    for line in sys.stdin:
+        if not line.strip():
+            if lines:
+                break
+            continue
+        lines.append(line)
+    
+    # Split on any whitespace/comma run; drop duplicates, keep paste order
+    keys = list(dict.fromkeys(k for k in re.split(r'[\s,]+', "".join(lines)) if k))
+    for i in range(len(keys)):
+        print(f"   ✅ Added Key #{i+1}")
     
     if not keys:
         print("\n❌ No keys added. Exiting.")
@@ -27,32 +33,18 @@ def main():
     keys_str = ",".join(keys)
     
     # Path to .env
-    env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
-    
-    # Read existing .env
-    lines = []
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            lines = f.readlines()
+    env_path = Path(__file__).resolve().parent.parent / '.env'
+    text = env_path.read_text() if env_path.exists() else ''
     
-    # Update or Append
-    new_lines = []
-    found = False
-    for line in lines:
-        if line.startswith("GOOGLE_API_KEYS="):
-            new_lines.append(f"GOOGLE_API_KEYS={keys_str}\n")
-            found = True
-        elif line.startswith("GOOGLE_API_KEY="):
-             pass # Remove single key legacy config to avoid confusion
-        else:
-            new_lines.append(line)
-            
-    if not found:
-        new_lines.append(f"\nGOOGLE_API_KEYS={keys_str}\n")
+    # Remove single key legacy config to avoid confusion, then update or append
+    text = re.sub(r'^GOOGLE_API_KEY=.*\n?', '', text, flags=re.M)
+    new_line = f"GOOGLE_API_KEYS={keys_str}\n"
+    # Callable replacement: pasted keys are inserted literally, never parsed as a template
+    text, n = re.subn(r'^GOOGLE_API_KEYS=.*\n?', lambda _: new_line, text, flags=re.M)
+    if n == 0:
+        text = (text.rstrip('\n') + '\n' if text else '') + new_line
     
-    # Write back
-    with open(env_path, 'w') as f:
-        f.writelines(new_lines)
+    env_path.write_text(text)
         
     print(f"\n✨ Saved {len(keys)} keys to {env_path}")
     print("🚀 You can now run the debate system with higher limits!")